@@ -1,3 +1,374 @@
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+from hashlib import sha1
+from io import BufferedReader, BytesIO
+from os import makedirs, remove, replace
+from os.path import exists, expanduser, getmtime, join
+from pickle import dump, load
+from shutil import copyfileobj
+import re
+from sys import intern
+from tempfile import NamedTemporaryFile
+from threading import local
+from time import time
+
+from lxml import etree
+from numpy import array, generic
+from owslib.fes import Or, PropertyIsLike
+from owslib.util import ServiceException
+import requests
+
+# Property data keys, other than those containing 'tun', which are
+# identifiers and should be retained as strings
+_ID_KEYS = frozenset(('vtj_prt', 'posno'))
+# Directory for storing responses from the API, and the time in seconds 
+# after which stored responses are requested from the API again
+_CACHE_DIR = join('~', '.cache', 'hsy')
+_CACHE_EXPIRE = 86400
+# Layout version of the parsed database cache files written by write_cache:
+# cache files of any other layout are ignored, and the XML data re-read
+_PICKLE_VERSION = 2
+# Storage of the HTTP session of each thread: see _get_session
+_sessions = local()
+# Pattern matching strings with decimal or exponential numerical data
+_FLOAT_RE = re.compile(r'\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$')
+
+
+def _as_is(value):
+    ''' Returns value unchanged '''
+    return value
+
+
+class _Missing():
+    ''' Marker of data missing from a property in the data columns 
+
+    Data items present in the XML data, but empty, are stored as None: the
+    marker distinguishes the data items not present for a property at all.
+    The marker is pickled by reference, so that the marker restored from a
+    cache file is the same object.
+    '''
+    __slots__ = ()
+
+    def __repr__(self):
+        ''' Returns representation of the marker '''
+        return '<missing>'
+
+    def __reduce__(self):
+        ''' Pickles the marker as a reference to _MISSING '''
+        return '_MISSING'
+
+
+# The only instance of the missing data marker
+_MISSING = _Missing()
+
+
+# Use the compiled per-feature helpers, if hsyclass_core.pyx has been built,
+# and fall back to the pure Python implementations below otherwise
+try:
+    if __package__:
+        from .hsyclass_core import _append_row, _feature_to_dict, _to_number
+    else:
+        from hsyclass_core import _append_row, _feature_to_dict, _to_number
+except ImportError:
+    def _append_row(columns, converters, propdata, nrows, missing):
+        ''' Appends converted data of property as row nrows of columns '''
+        for key, value in propdata.items():
+            column = columns.get(key)
+            # Data key not seen before: create column, and mark the data 
+            # missing from all previous rows
+            if column is None:
+                column = columns[key] = [missing] * nrows
+            # Convert the data and store it to the column
+            column.append(converters[key](value))
+        # Mark the data missing from this property in the columns of all 
+        # data keys not present for this property
+        if len(propdata) < len(columns):
+            for column in columns.values():
+                if len(column) == nrows:
+                    column.append(missing)
+
+    def _feature_to_dict(elem, names):
+        ''' Returns dictionary of data item names and texts of feature '''
+        # Create a temporary dictionary for storing propery data
+        propdata = {}
+        # Go through all data stored for this property
+        for item in elem:
+            # The item tag ends in the parameter name: look up the name 
+            # of the tag and use it as key in dictionary. The property text
+            # as string is the data entry for key
+            propdata[names[item.tag]] = item.text
+        return propdata
+
+    def _to_number(value):
+        ''' Returns value as int or float, or unchanged if not numerical '''
+        # Missing data is returned as is
+        if value is None:
+            return value
+        # Data string contains only digits, with an optional sign: cast it
+        # directly to int
+        digits = value[1:] if value[:1] in ('-', '+') else value
+        if digits.isdecimal():
+            return int(value)
+        # See if the data string contains numerical data: if not, return the
+        # original data string
+        if _FLOAT_RE.match(value) is None:
+            return value
+        value = float(value)
+        # Check whether the data is within a millionth of an integer:
+        # necessary as all ints are stored as floats in the database,
+        # and some get numerical noise.
+        if abs(value % 1) < 1e-6:
+            # Value is assumed to be an integer: return int of value
+            return int(value)
+        # Value is not integer, but float: return the float
+        return value
+
+
+def _as_shared(value):
+    ''' Returns value as shared, interned string 
+
+    Equal strings are stored as the same object, rather than one copy per
+    property, and compare by identity when used as dictionary keys.
+    '''
+    # Missing data is returned as is
+    if value is None:
+        return value
+    return intern(value)
+
+
+# Converters for the known pks_rakennukset_paivittyva property data keys.
+# Identifiers are numerical, but may start with zeros: casting them as 
+# floats removes leading zeros, resulting in potentially non-unique 
+# identifiers, as well as issues when searching the database. Thus, they
+# are retained as strings along with the descriptive data
+_CONVERTERS = {
+    # Identifiers: postal codes are shared by many properties
+    'vtj_prt': _as_is, 'raktun': _as_is, 'kiitun': _as_is, 
+    'kokotun': _as_is, 'posno': _as_shared,
+    # Descriptive data: street names and the few descriptions of each 
+    # classification are shared by many properties
+    'katu': _as_shared, 'oski1': _as_shared, 'kayttarks': _as_shared, 
+    'rakennusaine_s': _as_shared, 'julkisivu_s': _as_shared, 
+    'lammitystapa_s': _as_shared, 'lammitysaine_s': _as_shared, 
+    'olotila_s': _as_shared, 'geometria': _as_shared, 'geom': _as_is,
+    # Numerical data
+    'kunta': _to_number, 'osno1': _to_number, 'osno2': _to_number,
+    'kavu': _to_number, 'kayttark': _to_number, 'kerala': _to_number,
+    'korala': _to_number, 'kohala': _to_number, 'ashala': _to_number,
+    'asuntojen_lkm': _to_number, 'kerrosten_lkm': _to_number,
+    'rakennusaine': _to_number, 'julkisivu': _to_number, 
+    'lammitystapa': _to_number, 'lammitysaine': _to_number, 
+    'viemari': _to_number, 'vesijohto': _to_number, 'olotila': _to_number,
+    'poimintapvm': _to_number,
+}
+
+
+def _get_converter(key):
+    ''' Returns the converter function for property data key '''
+    # Look up the converter for known data keys
+    converter = _CONVERTERS.get(key)
+    if converter is not None:
+        return converter
+    # Identifiers are retained as strings: any key contaning 'tun', or 
+    # matching 'vtj_prt' or 'posno' are assumed to be idetifiers
+    if ('tun' in key) or (key in _ID_KEYS):
+        return _as_is
+    # Unknown data: try to cast the data to int or float
+    return _to_number
+
+
+class _TagNames(dict):
+    ''' Dictionary of property data names by namespaced XML tag 
+
+    The name of each tag, i.e. the tag stripped of its {namespace} prefix,
+    is resolved once, when the tag is first looked up. The same name 
+    object is returned for every lookup thereafter.
+    '''
+    def __missing__(self, tag):
+        ''' Resolves and stores the name of tag '''
+        name = self[tag] = intern(tag[tag.find('}') + 1:])
+        return name
+
+
+class _Converters(dict):
+    ''' Dictionary of converter functions by property data key 
+
+    The converter of each data key is resolved once, when the key is first
+    looked up, rather than once per value.
+    '''
+    def __missing__(self, key):
+        ''' Resolves and stores the converter of data key '''
+        converter = self[key] = _get_converter(key)
+        return converter
+
+
+class _PropertyViews(Mapping):
+    ''' Read-only mapping of Property views by vtj_prt key 
+
+    The Property view of a property is created when the property is looked
+    up, so that looking up a property takes constant time, regardless of
+    the number of properties in the database.
+    '''
+    def __init__(self, columns, prt_index):
+        ''' Initializes the mapping over the columns and row index '''
+        self._columns = columns
+        self._prt_index = prt_index
+
+    def __getitem__(self, key):
+        ''' Returns Property view of the row of property key '''
+        return Property(self._columns, self._prt_index[key])
+
+    def __iter__(self):
+        ''' Iterates over the vtj_prt keys, in the order of the rows '''
+        return iter(self._prt_index)
+
+    def __len__(self):
+        ''' Returns the number of properties '''
+        return len(self._prt_index)
+
+    def __contains__(self, key):
+        ''' Returns whether property key is in the database '''
+        return key in self._prt_index
+
+
+def _get_session():
+    ''' Returns HTTP session of the calling thread 
+
+    Connections to the API are kept open and reused between the requests 
+    made by each thread. Each thread, e.g. of the pools of from_streets 
+    and stream_pages, gets its own session, as requests sessions are not 
+    guaranteed to be thread-safe.
+    '''
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def _to_array(values):
+    ''' Returns list of property data values as numpy array 
+
+    Columns with only int or only float values are stored as numerical 
+    arrays, which can be operated on directly. Columns with strings, 
+    missing values, or a mix of types are stored as object arrays, so 
+    that all values are retained as is.
+    '''
+    # Check what types of values are present in the column
+    types = set(map(type, values))
+    if types == {int}:
+        try:
+            return array(values, dtype='int64')
+        except OverflowError:
+            # Value too large for int64: fall back to object array
+            pass
+    elif types == {float}:
+        return array(values, dtype='float64')
+    return array(values, dtype=object)
+
+
+def _count_features(page):
+    ''' Returns number of features in XML data page, None if not reported 
+
+    Only the root element of the page is read: the page is rewound to the 
+    start afterwards.
+    '''
+    # Read the attributes of the root element, which is the first element
+    # started in the data
+    for event, root in etree.iterparse(page, events=('start',)):
+        break
+    page.seek(0)
+    # WFS 1.1.0 reports the number of features in the page as 
+    # numberOfFeatures, and WFS 2.0.0 as numberReturned
+    count = root.get('numberOfFeatures', root.get('numberReturned'))
+    if count is None:
+        return None
+    return int(count)
+
+
+def _root_name(source):
+    ''' Returns name of root element of XML data, None if not found 
+
+    Only the start of the data, as buffered by source, is inspected: no 
+    data is consumed from source.
+    '''
+    # Parse the start of the data until the root element is started
+    parser = etree.XMLPullParser(events=('start',))
+    try:
+        parser.feed(source.peek(65536))
+    except etree.XMLSyntaxError:
+        # Not XML data: leave the error to be raised by the parser reading
+        # the data
+        return None
+    for event, root in parser.read_events():
+        # Strip the {namespace} prefix of the root tag
+        return root.tag[root.tag.find('}') + 1:]
+    return None
+
+
+def _raise_report(source):
+    ''' Raises ServiceException with the messages of exception report 
+
+    source contains an OWS ExceptionReport or OGC ServiceExceptionReport, 
+    returned by the API instead of the requested data.
+    '''
+    # Exception reports are short: read the whole report
+    report = etree.fromstring(source.read())
+    # Collect the texts of all exceptions in the report
+    message = ' '.join(text.strip() for text in report.itertext() 
+        if text.strip())
+    raise ServiceException(message)
+
+
+def _count_matched(source):
+    ''' Returns number of features matching request, None if not reported 
+
+    source is the response to a request for the number of features only, 
+    i.e. with resultType hits. Only the root element of the response is 
+    read.
+    '''
+    # Read the attributes of the root element, which is the first element
+    # started in the data
+    for event, root in etree.iterparse(source, events=('start',)):
+        break
+    # WFS 1.1.0 reports the number of matching features as 
+    # numberOfFeatures, and WFS 2.0.0 as numberMatched, which may also be
+    # 'unknown'
+    count = root.get('numberMatched', root.get('numberOfFeatures'))
+    if count is None or not count.isdecimal():
+        return None
+    return int(count)
+
+
+def _first_identifier(page):
+    ''' Returns vtj_prt of first property in XML data page, None if none 
+
+    The page is rewound to the start afterwards.
+    '''
+    # Read the data until the first identifier has been read
+    identifier = None
+    for event, elem in etree.iterparse(page, tag='{*}vtj_prt'):
+        identifier = elem.text
+        break
+    page.seek(0)
+    return identifier
+
+
+def _get_data(columns, key, row, default=None):
+    ''' Returns data key of row in columns, default if missing '''
+    column = columns.get(key)
+    # No property has data for key
+    if column is None:
+        return default
+    value = column[row]
+    # The property has no data for key
+    if value is _MISSING:
+        return default
+    # Return numerical data as Python int or float, rather than as numpy 
+    # scalar
+    if isinstance(value, generic):
+        return value.item()
+    return value
 
 
 class HSYdatabase():
@@ -11,44 +382,67 @@ class HSYdatabase():
         wfs version requested
     featuretype - str
         feature to be accessed from wfs database
-    properties - dict
-        properties database, sorted by vtj_prt key
+    cache - bool
+        whether API responses are stored to and served from the local 
+        response cache at ~/.cache/hsy
+    columns - dict
+        property data database, stored column-wise: one numpy array per
+        data key, with one row per property. Data missing from a property
+        is stored as the _MISSING marker, and empty data as None
+    prt_index - dict
+        row index of each property in columns, sorted by vtj_prt key
+    properties - Mapping
+        read-only properties database, sorted by vtj_prt key. Members are
+        Property objects viewing the columns, created on lookup
     address - dict
         registry of properties by address, osno1. Memebers are lists of
         vtj_prt registered at each address
     duplicates - list
-        list of objects with duplicate vtj_prt values. First instance is
-        stored in properties, second instance is stored to duplicates
+        list of data dictionaries with duplicate vtj_prt values. First 
+        instance is stored in columns, second instance is stored to 
+        duplicates as read from the XML data, with all data as strings
 
     Methods
     -------
+    from_streets(cls, streets, max_workers=8)
+        Creates database by downloading streets concurrently
+    initialize(self, url, version, featuretype, cache=False)
+        Sets up empty database and API access parameters
     create_addressdict(self)
         Creates address dictionary from properties for lookup purposes
     create_fromfile(self, fname)
         Reads property data from file and creates property database
-    create_fromstring(self, street)
+    create_fromcache(self, fname)
+        Restores parsed property database from cache file
+    create_fromstream(self, street=None, pagesize=None)
         Creates properties database by downloading from wfs server
     write_HSY(self, fname, street=None, read=True)
         Dumps data from wfs server and creates properties database
-    stream_HSY(self, street=None)
-        Returns string with street data, dump if street is None
+    stream_HSY(self, street=None, startindex=None, maxfeatures=None,
+        resulttype=None)
+        Returns file object with street data, dump if street is None
+    stream_pages(self, street=None, pagesize=1000, max_workers=8)
+        Returns iterator of file objects with street data in pages
     write__to_file(self, fname, street=None)
         Writes street to fname, dump if street is None
-    xmltodict(self, etree)
-        Recursively parses XML ElementTree to properties dictionary 
+    write_cache(self, fname)
+        Writes parsed property database to cache file
+    xmltodict(self, *sources)
+        Parses XML data from file objects to properties database
     get_propertyaddress(self, identifier)
         Returns address of property with identifier in database
     '''
     def __init__(self, street=None, fname=None, download=False,
         url='https://kartta.hsy.fi/geoserver/wfs', version='1.1.0', 
-        featuretype='asuminen_ja_maankaytto:pks_rakennukset_paivittyva'):
+        featuretype='asuminen_ja_maankaytto:pks_rakennukset_paivittyva',
+        pagesize=None, cache=False):
         ''' Initializes HSY database object 
 
         Optional arguments
         ------------------
-        street - str [None]
-            Street to retrieve from database. If None, restores/
-            retrieves all data available in database
+        street - str or list [None]
+            Street, or list of streets, to retrieve from database. If None, 
+            restores/retrieves all data available in database
         fname - str [None]
             Path to local HSY database to restore. If none, opens API 
             connection and reads data into memory
@@ -56,60 +450,145 @@ class HSYdatabase():
             Switch to specify whether to download data from API server
             or look for stored XML data file under name fname. If set 
             to True, any retrieved data will be saved to XML file at 
-            fname 
+            fname. The parsed database is additionally stored to a cache 
+            file at fname.pkl, which is restored instead of the XML file
+            if it is up to date
+        pagesize - int [None]
+            Number of properties to request from the API at a time, when 
+            streaming data directly to memory. If set, the data is 
+            requested in pages of pagesize properties, several pages
+            concurrently. If None, all data is requested at once
+        cache - bool [False]
+            Switch to specify whether to store the responses from the API 
+            server to a local cache, from which identical requests are 
+            served for a day thereafter
 '''
 
-        # Set upp dictionaries to help accessing data by different keys
-        self.properties = {}
-        self.address = {}
-        # Initialize duplicates list
-        self.duplicates = []
-        # Store API url to object
-        self.url = url
-        # Store API version to object
-        self.version = version
-        # Store requested featuretype to object
-        self.featuretype = featuretype
+        # Set up the empty database and the API access parameters
+        self.initialize(url, version, featuretype, cache)
         # Check whether a file read/write is requested
         if fname is not None: 
             # Download data to file and read it
             if download is True:
                 self.write_HSY(fname, street)
-            # Do not download, read data from XML file
-            else:
-                self.create_fromfile(fname)
+                # Create address lookup dictionary
+                self.create_addressdict()
+                # Store the parsed database to cache file for fast 
+                # restoring
+                self.write_cache(fname)
+                return
+            # Do not download: restore the parsed database from the cache 
+            # file, unless the XML data file has been updated since the 
+            # cache file was written
+            if exists(fname + '.pkl') and (not exists(fname) or 
+                getmtime(fname + '.pkl') >= getmtime(fname)):
+                if self.create_fromcache(fname):
+                    return
+            # No usable cache available, read data from XML file
+            self.create_fromfile(fname)
         # If not, stream data directly to memory without
         # reading/writing from/to file
         else:
-            self.create_fromstream(street)
+            self.create_fromstream(street, pagesize)
         # Create address lookup dictionary
         self.create_addressdict()
         return
 
+    @classmethod
+    def from_streets(cls, streets, max_workers=8, 
+        url='https://kartta.hsy.fi/geoserver/wfs', version='1.1.0', 
+        featuretype='asuminen_ja_maankaytto:pks_rakennukset_paivittyva',
+        cache=False):
+        ''' Creates database by downloading streets concurrently
+
+        Each street is requested from the API separately, with the requests
+        made concurrently by a pool of threads. The data of all streets is 
+        then read into a single database.
+
+        Arguments
+        ---------
+        streets : list
+            List of street names to be fetched from API
+
+        Optional arguments
+        ------------------
+        max_workers : int [8]
+            Maximum number of concurrent requests to the API
+        cache : bool [False]
+            Switch to specify whether to use the local response cache
+        '''
+        # Create an empty database object, without retrieving any data
+        database = cls.__new__(cls)
+        database.initialize(url, version, featuretype, cache)
+        # Request the streets concurrently: the threads spend most of their 
+        # time waiting for the API, during which the other threads run. 
+        # Each thread reads its whole response, as the responses are only
+        # parsed once all have been received
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(lambda street: BytesIO(
+                database.stream_HSY(street).read()), streets))
+        # Read the data of all streets into the database
+        database.xmltodict(*responses)
+        # Create address lookup dictionary
+        database.create_addressdict()
+        return database
+
+    def initialize(self, url, version, featuretype, cache=False):
+        ''' Sets up empty database and API access parameters 
+
+        Arguments
+        ---------
+        url : str
+            URL to wfs database
+        version : str
+            wfs version requested
+        featuretype : str
+            feature to be accessed from wfs database
+
+        Optional arguments
+        ------------------
+        cache : bool [False]
+            Switch to specify whether to use the local response cache
+        '''
+        # Set upp dictionaries to help accessing data by different keys
+        self.columns = {}
+        self.prt_index = {}
+        self.address = {}
+        # Initialize duplicates list
+        self.duplicates = []
+        # Store API url to object
+        self.url = url
+        # Store API version to object
+        self.version = version
+        # Store requested featuretype to object
+        self.featuretype = featuretype
+        # Store response cache switch to object
+        self.cache = cache
+
+    @property
+    def properties(self):
+        ''' Properties mapping, sorted by vtj_prt key '''
+        # Return a mapping creating a Property object viewing the row of 
+        # a property when it is looked up: no view is created up front
+        return _PropertyViews(self.columns, self.prt_index)
+
     def create_addressdict(self):
         ''' Creates address dictionary for lookup purposes '''
-        
+        # Store the street names and numbers of all properties to lists, 
+        # in the order of the rows: None if the property has no street 
+        # name or number
+        rows = range(len(self.prt_index))
+        streets = [_get_data(self.columns, 'katu', row) for row in rows]
+        numbers = [_get_data(self.columns, 'osno1', row) for row in rows]
         # Go through each property in the database
-        for key, element in self.properties.items():
-            # Store the street name and number of the Property
-            # object to temporary variables
-            street, number = element.address()
-            # Check that address dictionary entry for the Property
-            # street exists: if it does not, create it as a dictionary
-            try:
-                self.address[street]
-            except:
-                self.address[street] = {}
-            # Now, check whether the street already has any properies
-            # listed at the address. If not, create and empty list for
-            # storing all properties at this address
-            try:
-                self.address[street][number]
-            except:
-                self.address[street][number] = []
-            # Store the 'vtj_prt' identifiers for the address
-            # to the address entry
-            self.address[street][number].append(key) 
+        for key, street, number in zip(self.prt_index, streets, numbers):
+            # Get the address dictionary entry for the Property street, 
+            # creating it as an empty dictionary if it does not exist. Then,
+            # get the list of properties listed at the address, creating an
+            # empty list if there are none yet. Finally, store the 'vtj_prt' 
+            # identifier for the address to the address entry
+            self.address.setdefault(street, {}).setdefault(number, 
+                []).append(key)
 
     def create_fromfile(self, fname):
         ''' Reads property data from file and creates property database
@@ -120,29 +599,69 @@ class HSYdatabase():
             String with path to xml datafile to be read into properties 
             dictionary
         '''
-        from xml.etree import cElementTree as ElementTree
-        # In a oneliner: pass an ElementTree's root, created from file
-        # fname, to the xmltodict function. xmltodict reads the data in the 
-        # file, and creates properties based on the data. The data is stored
-        # in properties, using their 'vtj_prt' values as identifier
-        self.xmltodict(ElementTree.parse(fname).getroot())
+        # Open the file in binary mode and pass the file object directly to
+        # xmltodict: the XML parser reads the file in chunks as it goes,
+        # rather than reading the whole file into a string first. xmltodict 
+        # reads the data in the file, and creates properties based on the 
+        # data. The data is stored in properties, using their 'vtj_prt' 
+        # values as identifier
+        with open(fname, 'rb') as source:
+            self.xmltodict(source)
 
-    def create_fromstream(self, street=None):
+    def create_fromcache(self, fname):
+        ''' Restores parsed property database from cache file
+
+        Returns True if the database was restored, and False if the cache 
+        file could not be read or was written in another layout, in which 
+        case the database is left unchanged.
+    
+        Arguments
+        ---------
+        fname : str
+            String with path to xml datafile, whose cache file fname.pkl
+            is to be restored
+        '''
+        # Read the columns, prt_index, address, and duplicates databases 
+        # from the cache file written by write_cache: no XML parsing or data 
+        # conversion is needed
+        try:
+            with open(fname + '.pkl', 'rb') as source:
+                cached = load(source)
+        # The cache file is only a copy of the XML data: any failure to 
+        # read it, e.g. a truncated file or one pickling objects of an 
+        # older version of this module, is treated as a missing cache
+        except Exception:
+            return False
+        # Cache files written in another layout cannot be restored
+        if not (isinstance(cached, tuple) and len(cached) == 5 and
+            cached[0] == _PICKLE_VERSION):
+            return False
+        (self.columns, self.prt_index, self.address, 
+            self.duplicates) = cached[1:]
+        return True
+
+    def create_fromstream(self, street=None, pagesize=None):
         ''' Creates properties database by downloading from wfs server
     
         Optional arguments
         ------------------
-        street : str [None]
-            String containing street name to be fetched from API and 
-            stored to the properties dictionary
+        street : str or list [None]
+            String containing street name, or list of street names, to be 
+            fetched from API and stored to the properties dictionary
+        pagesize : int [None]
+            Number of properties to request from the API at a time. If 
+            None, all data is requested at once
         '''
-        from xml.etree import cElementTree as ElementTree
-        # In a oneliner: Pass ElementTree's root, created from HSY API data
-        # stream, to the xmltodict function. xmltodict reads the data in the 
-        # file, and creates properties based on the data. The data is stored
+        # Request the data in pages, if requested, and read all pages into 
+        # the database
+        if pagesize is not None:
+            self._read_sources(self.stream_pages(street, pagesize))
+            return
+        # In a oneliner: Pass the HSY API data stream, as a file object, to 
+        # the xmltodict function. xmltodict reads the data in the stream, 
+        # and creates properties based on the data. The data is stored
         # in properties, using their 'vtj_prt' values as identifier
-        self.xmltodict(ElementTree.fromstring(self.stream_HSY(street)))
-
+        self.xmltodict(self.stream_HSY(street))
 
     def write_HSY(self, fname, street=None, read=True):
         ''' Downloads data from wfs server and creates properties database 
@@ -154,52 +673,240 @@ class HSYdatabase():
 
         Optional arguments
         ------------------
-        street : str [None]
-            Define street to write/read. If none, writes/reads all 
-            available data
+        street : str or list [None]
+            Define street, or list of streets, to write/read. If none, 
+            writes/reads all available data
         read : bool [True]
             Swith defining whether to read the data just saved into the
             properties dictionary.
 
 
         '''
-        # Download the HSY data from the API server, and save it to fname
-        self.write_to_file(fname, street)
         # Check if written data should be saved to object
         if read is True:
-            # If yes, read data into properties dictionary
-            self.create_fromfile(fname)
+            # If yes, download the HSY data from the API server and read it 
+            # into properties dictionary, while simultaneously writing each 
+            # chunk read to fname: the data is only traversed once. The 
+            # data is requested before opening fname, so that fname is not
+            # overwritten if the request fails
+            response = self.stream_HSY(street)
+            with open(fname, 'wb') as out:
+                tee = TeeReader(response, out)
+                self.xmltodict(tee)
+                # Make sure any trailing data not consumed by the parser
+                # is written to file, too
+                while tee.read(65536):
+                    pass
+        else:
+            # If not, download the HSY data from the API server, and save 
+            # it to fname
+            self.write_to_file(fname, street)
 
-    def stream_HSY(self, street=None):
-        ''' Returns string with street data, dump if street is None 
+    def stream_HSY(self, street=None, startindex=None, maxfeatures=None,
+        resulttype=None):
+        ''' Returns file object with street data, dump if street is None 
 
         Optional arguments
         ------------------
-        street : str [None]
-            Define street to write/read. If none, streams all available 
-            data
+        street : str or list [None]
+            Define street, or list of streets, to write/read. If none, 
+            streams all available data. All streets in the list are 
+            requested from the API in a single request
+        startindex : int [None]
+            Index of the first property to request, for requesting the 
+            data in pages. If None, starts from the first property
+        maxfeatures : int [None]
+            Maximum number of properties to request. If None, requests all
+        resulttype : str [None]
+            Type of result to request: 'hits' requests only the number of
+            properties matching the request. If None, requests the data
         '''
-        from owslib.fes import PropertyIsLike 
-        from owslib.etree import etree 
-        from owslib.wfs import WebFeatureService
-
-        # Open gateway to the HSY API
-        wfs11 = WebFeatureService(url=self.url, version=self.version) 
         # Check whether to filter for street name
         if street is not None:
+            # Treat a single street as a list of one street
+            if isinstance(street, str):
+                street = [street]
+            # An empty list matches no street: requesting all data instead
+            # is unlikely to be intended
+            if len(street) == 0:
+                raise ValueError('street must be a street name, or a '
+                    'non-empty list of street names')
             # Create a PropertyIsLike object from to the propoertyname 'katu'
-            make_filter = PropertyIsLike(propertyname='katu', literal=street) 
-            # Create an XML filter from PropertyIsLike object
+            # for each requested street
+            make_filter = [PropertyIsLike(propertyname='katu', literal=name)
+                for name in street]
+            # Several streets are requested: combine the filters, so that
+            # features matching any of the streets are returned
+            if len(make_filter) > 1:
+                make_filter = Or(make_filter)
+            else:
+                make_filter = make_filter[0]
+            # Create an XML filter from the filter object
             filterxml = etree.tostring(make_filter.toXML()).decode("utf-8") 
         else:
             # If no street requested, create None XML filter
             filterxml = None
-        # Get the response object from the API portal, with any applied filter
-        response = wfs11.getfeature(typename=self.featuretype, 
-            filter=filterxml)
-        # TODO: add checks to ensure response is good, or throw error otherwise
-        # Return all data from the API portal in a single string
-        return response.read()
+        # Check whether the response is stored in the response cache
+        if self.cache is True:
+            # Name the stored response after the request parameters
+            request = repr((self.url, self.version, self.featuretype, 
+                filterxml, startindex, maxfeatures, 
+                resulttype)).encode('utf-8')
+            fname = join(expanduser(_CACHE_DIR), 
+                sha1(request).hexdigest() + '.gml.gz')
+            # Return the stored response, unless it has expired
+            if exists(fname) and time() - getmtime(fname) < _CACHE_EXPIRE:
+                return gzip.open(fname, 'rb')
+        # Build the GetFeature query directly, rather than through a 
+        # WebFeatureService gateway, which would first request and parse 
+        # the capabilities document of the API
+        params = {'service': 'WFS', 'version': self.version, 
+            'request': 'GetFeature', 'typeName': self.featuretype}
+        if filterxml is not None:
+            params['filter'] = filterxml
+        if startindex is not None:
+            params['startIndex'] = startindex
+        if maxfeatures is not None:
+            # WFS 2.0.0 renamed maxFeatures to count
+            if self.version.startswith('2'):
+                params['count'] = maxfeatures
+            else:
+                params['maxFeatures'] = maxfeatures
+        if resulttype is not None:
+            params['resultType'] = resulttype
+        # Request the data from the API portal, with any applied filter. 
+        # The response is streamed, so that the data is read from the 
+        # connection in chunks as it is parsed, rather than first being 
+        # held in memory in full
+        response = _get_session().get(self.url, params=params, stream=True, 
+            timeout=30)
+        # Raise an error if the API returned an HTTP error status
+        response.raise_for_status()
+        # Read the raw data from the connection, decompressing it if the
+        # API compressed it for transfer. The data is buffered, so that the
+        # start of the data can be inspected without consuming it. The 
+        # connection must then not be closed as soon as all data has been 
+        # read, as the buffer still checks it for more data
+        response.raw.decode_content = True
+        response.raw.auto_close = False
+        response = BufferedReader(response.raw, 65536)
+        # The API reports errors in the request, e.g. in the filter, as 
+        # exception reports, which may be returned with a success status:
+        # raise an error rather than return a report without any data
+        root = _root_name(response)
+        if root in ('ExceptionReport', 'ServiceExceptionReport'):
+            _raise_report(response)
+        # Store a compressed copy of the response to the response cache. 
+        # Only feature collections are stored, so that no other response
+        # is served from the cache in place of the data. The copy is 
+        # written to a temporary file first, so that a partly written 
+        # response is never read from the cache
+        if self.cache is True and root == 'FeatureCollection':
+            makedirs(expanduser(_CACHE_DIR), exist_ok=True)
+            with NamedTemporaryFile(dir=expanduser(_CACHE_DIR), 
+                delete=False) as out:
+                try:
+                    with gzip.open(out, 'wb') as zipped:
+                        copyfileobj(response, zipped, 65536)
+                except BaseException:
+                    # Reading the response failed, e.g. the connection was
+                    # lost: remove the partly written copy
+                    out.close()
+                    remove(out.name)
+                    raise
+            replace(out.name, fname)
+            # The connection has been read: read the data from the cache
+            return gzip.open(fname, 'rb')
+        # Return the file object with the data from the API portal
+        return response
+
+    def stream_pages(self, street=None, pagesize=1000, max_workers=8):
+        ''' Returns iterator of file objects with street data in pages
+
+        The number of properties matching the request is requested first, 
+        and the pages covering them are then requested concurrently, 
+        max_workers pages at a time. Each group of pages is returned once
+        received, while the next group is being requested, so that at most 
+        two groups of pages are held in memory. If the API does not report
+        the number of matching properties, or does not return the first 
+        two pages as requested, the data is not paged.
+
+        Optional arguments
+        ------------------
+        street : str or list [None]
+            Define street, or list of streets, to request. If none, 
+            requests all available data
+        pagesize : int [1000]
+            Number of properties to request in each page
+        max_workers : int [8]
+            Maximum number of concurrent requests to the API
+        '''
+        # Check the page size here, rather than once the pages are 
+        # iterated over
+        if not isinstance(pagesize, int) or pagesize < 1:
+            raise ValueError('pagesize must be a positive integer, not '
+                '{!r}'.format(pagesize))
+        return self._iter_pages(street, pagesize, max_workers)
+
+    def _iter_pages(self, street, pagesize, max_workers):
+        ''' Yields file objects with street data in pages 
+
+        See stream_pages.
+        '''
+        # Request the number of properties matching the request, which 
+        # sets the number of pages to request
+        response = self.stream_HSY(street, resulttype='hits')
+        total = _count_matched(response)
+        response.close()
+        # The API does not report the number: request all data at once
+        if total is None:
+            yield self.stream_HSY(street)
+            return
+
+        def request(start):
+            ''' Returns page starting at start, read to memory '''
+            # Read the whole page in the requesting thread, so that the 
+            # page is received concurrently, and can be rewound after
+            # counting its properties
+            return BytesIO(self.stream_HSY(street, start, pagesize).read())
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Request the first two pages on their own, to check that the 
+            # API pages the data before requesting the other pages
+            page = request(0)
+            count = _count_features(page)
+            if count != min(pagesize, total):
+                # The API ignores the page size: the first page already 
+                # contains all data, unless it is not reported as such
+                if count is not None and count >= total:
+                    yield page
+                else:
+                    yield self.stream_HSY(street)
+                return
+            if total > pagesize:
+                second = request(pagesize)
+                # The API ignores the start index, and returns the first 
+                # page for every page: request all data at once
+                if _first_identifier(second) == _first_identifier(page):
+                    yield self.stream_HSY(street)
+                    return
+                yield page
+                page = second
+            yield page
+            # Request the remaining pages in groups of max_workers pages:
+            # each group is requested before the previous group is 
+            # returned, so that the next pages are received while the 
+            # previous ones are read
+            starts = range(2 * pagesize, total, pagesize)
+            received = []
+            for index in range(0, len(starts), max_workers):
+                requested = [executor.submit(request, start) for start in 
+                    starts[index:index + max_workers]]
+                for future in received:
+                    yield future.result()
+                received = requested
+            for future in received:
+                yield future.result()
 
     def write_to_file(self, fname, street=None):
         ''' Writes street to fname, dump if street is None 
@@ -211,71 +918,189 @@ class HSYdatabase():
 
         Optional arguments
         ------------------
-        street : str [None]
-            Define street to write/read. If none, writes/reads all 
-            available data
+        street : str or list [None]
+            Define street, or list of streets, to write/read. If none, 
+            writes/reads all available data
         '''
-        # Store data from API portal to data
-        data = self.stream_HSY(street)
+        # Get the file object with the data from the API portal
+        response = self.stream_HSY(street)
         # Open file with path/name fname for writing
-        out = open(fname, 'wb') 
-        # Write XML data into binary file
-        out.write(str.encode(data))
-        # Close the files
-        out.close()
-
-    def xmltodict(self, etree):
-        ''' Recursively parses XML ElementTree to properties dictionary '''
-        from copy import deepcopy
-    
-        # Iterate over every entry in etree
-        for child in etree:
-            # The object has more levels, read recursively
-            if len(child[0]) != 0:
-                self.xmltodict(child)
-            # This is the data-storage level of the file: store data
-            else:
-                # Create a temporary dictionary for storing propery data
-                propdata= {}
-                # Go through all data stored for this property
-                for item in child:
-                    # The item tag ends in the parameter name: split the
-                    # tag on curly bracket and use end as key in dictionary.
-                    # The property text as string is the data entry for key
-                    propdata[item.tag.split('}')[-1]] = item.text
-                # All data has been read: create property object using data
-                # just read ands stored to propdata
-                try:
-                    # Check if the identifier already exists: if it does not
-                    # an error is produced and the exception is executed. 
-                    # If no error is produced, evaluate the remaining lines 
-                    # and skip the exception
-                    self.properties[propdata['vtj_prt']]
+        with open(fname, 'wb') as out:
+            # Write XML data into binary file in chunks, rather than 
+            # holding a second copy of all data in memory
+            copyfileobj(response, out, 65536)
+
+    def write_cache(self, fname):
+        ''' Writes parsed property database to cache file 
+
+        Arguments
+        ---------
+        fname : str
+            String/path to xml datafile, whose cache file fname.pkl is 
+            written
+        '''
+        # Store the columns, prt_index, address, and duplicates databases 
+        # to binary file, from which they can be restored by 
+        # create_fromcache. Protocol 5 stores the numerical columns 
+        # without intermediate copies. The layout version is stored first,
+        # so that cache files of other layouts are recognized
+        with open(fname + '.pkl', 'wb') as out:
+            dump((_PICKLE_VERSION, self.columns, self.prt_index, 
+                self.address, self.duplicates), out, protocol=5)
+
+    def xmltodict(self, *sources):
+        ''' Parses XML data from file objects to properties database 
+
+        The XML data is parsed incrementally: only the property features
+        are picked out of the data, and each feature is discarded as soon
+        as it has been stored. Thus, the full XML tree is never kept in 
+        memory. The data is appended to any data already in columns.
+
+        Arguments
+        ---------
+        *sources : file object
+            Binary file objects containing the XML data to be read into 
+            properties database
+        '''
+        self._read_sources(sources)
+
+    def _read_sources(self, sources):
+        ''' Parses XML data from iterable of file objects to database
+
+        The sources are requested from the iterable one at a time, as the 
+        previous source has been read: see xmltodict.
+
+        Arguments
+        ---------
+        sources : iterable
+            Iterable of binary file objects containing the XML data to be 
+            read into properties database
+        '''
+        # The feature tag is namespaced, e.g. {namespace}pks_rakennukset_
+        # paivittyva: match any namespace using the lxml wildcard, so that 
+        # the namespace need not be known in advance
+        tag = '{*}' + self.featuretype.split(':')[-1]
+        # Collect the data columns to lists while parsing, starting from 
+        # any data already in the database
+        columns = {key: column.tolist() for key, column in 
+            self.columns.items()}
+        # Resolve the converter of each data key once per column, rather 
+        # than once per value: the identifier check is only made once
+        converters = _Converters()
+        # Store the dictionary and list accessed for every feature to local
+        # variables, for faster lookup in the loop
+        prt_index = self.prt_index
+        duplicates = self.duplicates
+        # Number of rows stored in the columns
+        nrows = len(prt_index)
+        # Data names of the XML tags: resolved once per tag
+        names = _TagNames()
+        # Read the sources one after another
+        for source in sources:
+            # Iterate over every property feature in source: the features 
+            # are returned as the parser finishes reading each of them. 
+            # huge_tree lifts the libxml2 size limits on single text nodes, 
+            # which large building geometries can exceed
+            for event, elem in etree.iterparse(source, events=('end',), 
+                tag=tag, huge_tree=True):
+                # Store the data of the property to a temporary dictionary
+                propdata = _feature_to_dict(elem, names)
+                # All data has been read: store the data just read ands stored
+                # to propdata
+                vtj_prt = propdata['vtj_prt']
+                # Check if the identifier already exists
+                if vtj_prt in prt_index:
                     # If the entry exists, leave the original entry and append
-                    # the new entry to the duplicates list
-                    self.duplicates.append(Property(propdata))
-                except:
-                    # If the object does not already exist, create it and 
-                    # store it in the properties dictionary with 'vrj_prt'
-                    # as key to access it.
-                    self.properties[propdata['vtj_prt']] = Property(propdata)
+                    # the new entry to the duplicates list as read: the data 
+                    # is not converted, as duplicates are rarely used
+                    duplicates.append(propdata)
+                else:
+                    # If the property does not already exist, store it as a new
+                    # row in the columns, with 'vtj_prt' as key to access it
+                    prt_index[vtj_prt] = nrows
+                    _append_row(columns, converters, propdata, nrows, 
+                        _MISSING)
+                    nrows += 1
+                # The feature has been stored: free the memory used by the
+                # feature, as well as by any already processed features still
+                # attached to the tree. The features are siblings in WFS
+                # 1.1.0 gml:featureMembers, but each feature is wrapped in
+                # its own wfs:member in WFS 2.0.0: remove the processed
+                # siblings at every level up to the root, so that the
+                # emptied wrappers are removed, too
+                elem.clear()
+                node = elem
+                parent = node.getparent()
+                while parent is not None:
+                    while node.getprevious() is not None:
+                        del parent[0]
+                    node, parent = parent, parent.getparent()
+        # All data has been read: store the columns as numpy arrays
+        self.columns = {key: _to_array(column) for key, column in 
+            columns.items()}
         return
 
     def get_propertyaddress(self, identifier):
         ''' Returns address of property with identifier in database '''
-        return self.properties[identifier].address()
+        # Read the street name and number directly from the columns
+        row = self.prt_index[identifier]
+        return (_get_data(self.columns, 'katu', row), 
+            _get_data(self.columns, 'osno1', row))
 
     def get_propertyobj(self, identifier):
         ''' Returns Property object with identifier in database '''
-        return self.properties[identifier]
+        # Create a Property object viewing the row of the property
+        return Property(self.columns, self.prt_index[identifier])
+
+
+class TeeReader():
+    ''' File object, which writes all data read from it to another file
+
+    Attributes
+    ----------
+    source - file object
+        Binary file object to read data from
+    out - file object
+        Binary file object to write all data read to
+
+    Methods
+    -------
+    read(self, size=-1)
+        Reads data from source, writes it to out, and returns it
+    '''
+    def __init__(self, source, out):
+        ''' Initializes the TeeReader object
+
+        Arguments
+        ---------
+        source - file object
+            Binary file object to read data from
+        out - file object
+            Binary file object to write all data read to
+        '''
+        self.source = source
+        self.out = out
+
+    def read(self, size=-1):
+        ''' Reads data from source, writes it to out, and returns it '''
+        # Read the requested amount of data from source
+        data = self.source.read(size)
+        # Store a copy of the data to the output file before passing it on
+        self.out.write(data)
+        return data
 
 
 class Property():
     ''' Class containing property information
 
+    The Property object is a view of one row in the columns of an 
+    HSYdatabase: the data is not copied, but read from the columns 
+    whenever accessed.
+
     Attributes
     ----------
-    Dynamically attributed from database
+    Dynamically attributed from database. Data missing from the property
+    is not available as an attribute, and data present but empty is None
 
     Methods
     -------
@@ -284,77 +1109,50 @@ class Property():
     print_properties(self)
         Prints all properties of property
     '''
-    def __init__(self, propertydict):
-        ''' Initializes the property data from dict 
-        
-        Dictionary keys are stored as attributes with entries as data.
-        Arguments are converted to int or float wherever possible. Only
-        the *tun* identifiers and vtj_prt and posno* attributes are
-        retained as str.
+    # The view only stores the columns and row: no per-object __dict__ 
+    # is needed
+    __slots__ = ('_columns', '_row')
 
+    def __init__(self, columns, row):
+        ''' Initializes the property view of the database columns
+        
         Arguments
         ---------
-        propertydict - dict
-            Dictionary contaning all data pertaiing to property
+        columns - dict
+            Dictionary contaning one array per data key, with the data of
+            all properties in the database
+        row - int
+            Row index of the property in the columns
         '''
-        from numpy import mod
-
-        # For every entry in the property data dictionary, i.e. for all data 
-        # supplied from teh API, save the data to the Property object
-        for key, value in propertydict.items():
-            # Try to cast the data to int or float
-            try:
-                # See if the data string contains numerical data> if not,
-                # go to exception and store string. If data can be cast as
-                # float, proceed with the operations
-                value = float(value)
-                # Check whether the data is within a millionth of an integer:
-                # necessary as all ints are stored as floats in the database,
-                # and some get numerical noise.
-                if abs(mod(value, 1)) < 1e-6:
-                    # Value is assumed to be an integer: set the parameter
-                    # name, as given by the API, to int of value
-                    setattr(self, key, int(value))
-                else:
-                    # Value is not integer, but float: set the parameter
-                    # name, as given by the API, to a float
-                    setattr(self, key, value)
-            except:
-                # Data is not numerical: set the parameter name, as given by 
-                # the API, to be the original data string
-                setattr(self, key, value)
-            # Overwrite with string in case of identifier: these are also
-            # numerical, but may start with zeros: casting them as floats
-            # removes leading zeros, resulting in potentially non-unique
-            # identifiers, as well as issues when searching the database
-            if ('tun' in key) or (key in ['vtj_prt', 'posno']):
-                # Any key contaning 'tun', or matching 'vtj_prt' or 'posno'
-                # are assumed to be idetifiers
-                setattr(self, key, value)
-    
+        self._columns = columns
+        self._row = row
+
+    def __getattr__(self, name):
+        ''' Returns data name of property from the database columns '''
+        # Private attributes are not property data: this also prevents 
+        # infinite recursion if the view has not been initialized
+        if name.startswith('_'):
+            raise AttributeError(name)
+        # Get the data from the row of the property in the data column
+        value = _get_data(self._columns, name, self._row, _MISSING)
+        # Data missing from the property is not available: data present 
+        # but empty is available as None
+        if value is _MISSING:
+            raise AttributeError(name)
+        return value
+
     def address(self):
         ''' Returns the street name and number '''
-        # Try to return data directly, if it was present in the database
-        try:
-            return self.katu, self.osno1
-        # All data requested was not available, return the data available
-        except:
-            # Check if katu exists
-            if hasattr(self, 'katu'):
-                # If it does, return street and return None for street number
-                return self.katu, None
-            # Otherwise, see if the Property has a street number but no name
-            elif hasattr(self, 'osno1'):
-                # If that is the case, return the number and none for street
-                return None, self.osno1
-            # Finally, it might be neither exist: return None for both
-            else:
-                return None, None
+        # Return the street name and number, or None for either if it is 
+        # missing from the property
+        return getattr(self, 'katu', None), getattr(self, 'osno1', None)
 
     def print_properties(self):
         ''' Prints all properties of property '''
         # Loop throough all data entires for Property
-        for key, value in self.__dict__.items():
-            # Print the propery names and values
-            print('{}:'.format(key).ljust(15), value)
+        for key in self._columns:
+            # Print the propery names and values of data available for the
+            # property
+            if hasattr(self, key):
+                print('{}:'.format(key).ljust(15), getattr(self, key))
 
@@ -0,0 +1,102 @@
+# cython: language_level=3
+''' Compiled versions of the per-feature helpers of hsyclass
+
+The functions in this module are drop-in replacements for the pure Python
+functions of the same name in hsyclass, which are used whenever this
+module has not been built. Build the module in place with
+
+    cythonize -i hsyclass_core.pyx
+
+Functions
+---------
+_append_row(columns, converters, propdata, nrows, missing)
+    Appends converted data of property as row nrows of columns
+_feature_to_dict(elem, names)
+    Returns dictionary of data item names and texts of feature element
+_to_number(value)
+    Returns value as int or float, or unchanged if not numerical
+'''
+import re
+
+# Pattern matching strings with decimal or exponential numerical data
+_FLOAT_RE = re.compile(r'\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$')
+
+
+cpdef void _append_row(dict columns, object converters, dict propdata, 
+    Py_ssize_t nrows, object missing):
+    ''' Appends converted data of property as row nrows of columns
+
+    Arguments
+    ---------
+    columns - dict
+        Dictionary of data columns, as lists of nrows values
+    converters - hsyclass._Converters
+        Dictionary of converter functions by data key
+    propdata - dict
+        Dictionary of data item names and texts of property
+    nrows - int
+        Number of rows already stored in columns
+    missing - hsyclass._Missing
+        Marker stored for data missing from a property
+    '''
+    cdef list column
+    for key, value in propdata.items():
+        column = columns.get(key)
+        # Data key not seen before: create column, and mark the data 
+        # missing from all previous rows
+        if column is None:
+            column = [missing] * nrows
+            columns[key] = column
+        # Convert the data and store it to the column
+        column.append(converters[key](value))
+    # Mark the data missing from this property in the columns of all data
+    # keys not present for this property
+    if len(propdata) < len(columns):
+        for column in columns.values():
+            if len(column) == nrows:
+                column.append(missing)
+
+
+cpdef dict _feature_to_dict(object elem, object names):
+    ''' Returns dictionary of data item names and texts of feature element
+
+    Arguments
+    ---------
+    elem - lxml.etree._Element
+        Property feature element, whose children are the data items
+    names - hsyclass._TagNames
+        Dictionary of data names by namespaced item tag
+    '''
+    cdef dict propdata = {}
+    # Go through all data stored for this property
+    for item in elem:
+        # Look up the name of the tag and use it as key
+        propdata[names[item.tag]] = item.text
+    return propdata
+
+
+cpdef object _to_number(object value):
+    ''' Returns value as int or float, or unchanged if not numerical '''
+    cdef str digits
+    cdef double number
+    # Missing data is returned as is
+    if value is None:
+        return value
+    # Data string contains only digits, with an optional sign: cast it
+    # directly to int
+    digits = value[1:] if value[:1] in ('-', '+') else value
+    if digits.isdecimal():
+        return int(value)
+    # See if the data string contains numerical data: if not, return the
+    # original data string
+    if _FLOAT_RE.match(value) is None:
+        return value
+    number = float(value)
+    # Check whether the data is within a millionth of an integer:
+    # necessary as all ints are stored as floats in the database,
+    # and some get numerical noise.
+    if abs(number % 1) < 1e-6:
+        # Value is assumed to be an integer: return int of value
+        return int(number)
+    # Value is not integer, but float: return the float
+    return number